@@ -1,14 +1,24 @@
+import os
+from contextlib import suppress
+from functools import partial
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
 import streamlit as st
 from io import BytesIO
 import bcrypt
+from tsdownsample import MinMaxLTTBDownsampler
 
 # ------------------------
 # PAGE CONFIG
 # ------------------------
 st.set_page_config(page_title="♻ Material Management Dashboard", layout="wide")
 
+# st.plotly_chart serializes through plotly.io; orjson is much faster than json there
+pio.json.config.default_engine = "orjson"
+
 # ------------------------
 # SESSION STATE SETUP
 # ------------------------
@@ -26,6 +36,224 @@ users = {
     "admin": b"$2a$12$Ppl5mnE7enzQP5bO79aXlOFOfvgVeHyfKd4t.YcrF1nVMmOuapBAG",
     "god": b"$2a$12$GbfJNu.gRCLuQvaioMQQcOObBZYRQ28IFSUQeu79joJJWUjw1wXKm"
 }
+# same cost as the real hashes, checked for unknown usernames so they take as long to reject
+DUMMY_HASH = b"$2b$12$t5Hkha/k2LDXBRxLWWOmO.sXl9sGfdWRgstYS/3jBXWsDHa8fYGjm"
+
+# ------------------------
+# EXCEL READER
+# ------------------------
+def read_sheets(path, sheet_names):
+    # a single read_excel call opens the workbook once for every sheet
+    # calamine (Rust) parses xlsx much faster than openpyxl; fall back to
+    # openpyxl when python-calamine or pandas>=2.2 isn't available
+    try:
+        sheets = pd.read_excel(path, sheet_name=sheet_names, engine="calamine")
+    except (ImportError, ValueError):
+        sheets = pd.read_excel(path, sheet_name=sheet_names, engine="openpyxl")
+    # headers may carry stray spaces
+    for df in sheets.values():
+        df.columns = df.columns.str.strip()
+    return [sheets[name] for name in sheet_names]
+
+# ------------------------
+# PARQUET SIDECAR
+# ------------------------
+def parquet_paths(path):
+    stem = os.path.splitext(path)[0].replace(" ", "_")
+    return stem + "_incoming.parquet", stem + "_outgoing.parquet"
+
+def text_columns(df):
+    # mixed int/str/time object columns (e.g. Product Code) can't go to arrow
+    # as-is; they become text before the sidecar is written, so the workbook and
+    # the sidecar hand back the same frames. dtypes rather than df[c] so
+    # duplicate headers reach arrow and fail there
+    return df.astype({c: "string" for c, dtype in df.dtypes.items() if dtype == object})
+
+def write_parquet(df, path):
+    try:
+        df.to_parquet(path, engine="pyarrow", compression="zstd", index=False)
+    except (ImportError, OSError, ValueError, TypeError, NotImplementedError):
+        # no pyarrow, a read-only folder or columns arrow can't store (ArrowInvalid,
+        # ArrowTypeError, duplicate headers...): keep reading the workbook instead,
+        # and don't leave a half-written sidecar that looks fresh
+        with suppress(OSError):
+            os.remove(path)
+
+def index_by_date(df):
+    # a sorted index of ticket days lets .loc slice date ranges by binary search
+    # instead of building a mask, and gives the daily trends their bucket key;
+    # the Ticket Date column stays as-is for the tables and the export
+    df = df.dropna(subset=["Ticket Date"]).sort_values("Ticket Date", kind="stable")
+    df.index = pd.DatetimeIndex(df["Ticket Date"].dt.normalize().to_numpy())
+    return df
+
+# ------------------------
+# DATA LOADER (shared across sessions, per file version)
+# ------------------------
+@st.cache_resource(max_entries=1, show_spinner="Loading data...")
+def load_sheets(path, mtime):
+    # mtime is only part of the cache key, so saving the workbook invalidates it,
+    # and max_entries=1 lets the frames of older versions go;
+    # cache_resource hands every rerun and session the same frames instead of
+    # unpickling a copy each time, so nothing downstream may modify them in place
+    incoming_pq, outgoing_pq = parquet_paths(path)
+    if all(os.path.exists(p) and os.path.getmtime(p) >= mtime for p in (incoming_pq, outgoing_pq)):
+        incoming_df = pd.read_parquet(incoming_pq)
+        outgoing_df = pd.read_parquet(outgoing_pq)
+    else:
+        incoming_df, outgoing_df = map(text_columns, read_sheets(path, ["INCOMING MASTER", "OUTGOING MASTER"]))
+        write_parquet(incoming_df, incoming_pq)
+        write_parquet(outgoing_df, outgoing_pq)
+
+    for df in (incoming_df, outgoing_df):
+        # calamine/openpyxl/parquet normally hand back datetimes already
+        if not pd.api.types.is_datetime64_any_dtype(df["Ticket Date"]):
+            df["Ticket Date"] = pd.to_datetime(df["Ticket Date"], cache=True)
+        df["Waste Type ID"] = df["Waste Type ID"].astype("string").str.strip().astype("category")
+        for col in ("Customer Name", "Grade"):
+            df[col] = df[col].astype("category")
+        # integer downcasting is exact, unlike float32 for the weights and costs
+        df["Ticket ID"] = pd.to_numeric(df["Ticket ID"], downcast="integer")
+
+    incoming_df, outgoing_df = index_by_date(incoming_df), index_by_date(outgoing_df)
+
+    # filter option lists only change with the file, so build them here once;
+    # category labels are already unique and sorted
+    customer_options = ("All",) + tuple(incoming_df["Customer Name"].cat.categories)
+    waste_type_options = ("All",) + tuple(incoming_df["Waste Type ID"].cat.categories)
+
+    return incoming_df, outgoing_df, customer_options, waste_type_options
+
+# ------------------------
+# FILTER FUNCTION
+# ------------------------
+def filter_sheet(df, start_date, end_date, waste_type, customer, price_filter="All"):
+    # slice the date range, then combine the remaining predicates into one
+    # mask so the frame is only copied once
+    sliced = df.loc[start_date:end_date]
+    masks = []
+    # membership test on the small-int category codes via a lookup table;
+    # labels this sheet doesn't have map to -1 and must not match missing (-1) codes.
+    # when every label of this sheet is picked (the "All" default on incoming)
+    # there is nothing to test; outgoing has types incoming lacks, so it still is
+    waste = sliced["Waste Type ID"].cat
+    selected = waste.categories.get_indexer(waste_type)
+    selected = np.unique(selected[selected >= 0])
+    if len(selected) < len(waste.categories):
+        masks.append(np.isin(waste.codes.to_numpy(), selected, kind="table"))
+    if customer != "All":
+        masks.append((sliced["Customer Name"] == customer).to_numpy())
+    if price_filter == "Priced":
+        masks.append((sliced["Cost"] > 0).to_numpy())
+    elif price_filter == "Not Priced":
+        masks.append(((sliced["Cost"] == 0) | sliced["Cost"].isna()).to_numpy())
+    if not masks:
+        return sliced
+    return sliced[np.logical_and.reduce(masks)]
+
+# ------------------------
+# AGGREGATES
+# ------------------------
+def group_sum(key, codes, labels, columns):
+    # np.bincount over integer codes; missing keys (-1) and labels with no rows
+    # are dropped, like groupby(observed=True)
+    keep = codes >= 0
+    codes = codes[keep]
+    seen = np.bincount(codes, minlength=len(labels)) > 0
+    data = {key: labels[seen]}
+    for name, values in columns.items():
+        data[name] = np.bincount(codes, weights=values[keep], minlength=len(labels))[seen]
+    return pd.DataFrame(data)
+
+def summarise_sheet(df):
+    # KPIs and chart series all come from arrays pulled out of the frame once
+    weights = np.nan_to_num(df["Net Weight (tn)"].to_numpy(dtype=np.float64))
+    costs = np.nan_to_num(df["Cost"].to_numpy(dtype=np.float64))
+    day_codes, days = pd.factorize(df.index)
+    return {
+        "weight": weights.sum(),
+        "cost": costs.sum(),
+        "by_waste_type": group_sum(
+            "Waste Type ID", df["Waste Type ID"].cat.codes.to_numpy(),
+            df["Waste Type ID"].cat.categories, {"Net Weight (tn)": weights}
+        ),
+        "by_grade": group_sum(
+            "Grade", df["Grade"].cat.codes.to_numpy(),
+            df["Grade"].cat.categories, {"Net Weight (tn)": weights}
+        ),
+        "by_day": group_sum(
+            "Ticket Date", day_codes, days, {"Net Weight (tn)": weights, "Cost": costs}
+        ),
+    }
+
+# ------------------------
+# FILTERED VIEW (cached per filter state)
+# ------------------------
+@st.cache_data(max_entries=16, show_spinner=False)
+def apply_filters(_incoming, _outgoing, filter_key):
+    # same keying as build_report: filter_key is (file mtime, start, end,
+    # waste types, customer, price filter), so the frames themselves aren't hashed
+    _, start_date, end_date, waste_type, customer, price_filter = filter_key
+    filtered_incoming = filter_sheet(_incoming, start_date, end_date, waste_type, customer, price_filter)
+    filtered_outgoing = filter_sheet(_outgoing, start_date, end_date, waste_type, customer)
+    return filtered_incoming, filtered_outgoing, summarise_sheet(filtered_incoming), summarise_sheet(filtered_outgoing)
+
+# ------------------------
+# FIGURES (cached per aggregated input)
+# ------------------------
+@st.cache_data(max_entries=32, show_spinner=False)
+def make_figure(kind, data, **kwargs):
+    # data is already aggregated, so hashing it is cheap; identical inputs
+    # skip Plotly Express and reuse the figure spec
+    return getattr(px, kind)(data, **kwargs).to_dict()
+
+PLOTLY_COLORS = {"Incoming": "#2ca02c", "Outgoing": "#1f77b4"}
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def make_paired_figure(trace, x, y, incoming, outgoing, title, layout=None, **kwargs):
+    # one graph_objects trace per side straight from the aggregates, instead of
+    # stacking them into a long frame for Plotly Express to split back up
+    fig = go.Figure()
+    for name, df in (("Incoming", incoming), ("Outgoing", outgoing)):
+        if not df.empty:
+            # bars only have a marker colour; scatter lines need theirs set too
+            colors = {"marker_color": PLOTLY_COLORS[name]}
+            if trace != "Bar":
+                colors["line_color"] = PLOTLY_COLORS[name]
+            fig.add_trace(getattr(go, trace)(
+                x=df[x].to_numpy(), y=df[y].to_numpy(), name=name, **colors, **kwargs
+            ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y, legend_title_text="Type")
+    if layout:
+        fig.update_layout(layout)
+    return fig.to_dict()
+
+# ------------------------
+# TREND DOWNSAMPLING
+# ------------------------
+TREND_MAX_POINTS = 1000
+
+def downsample_trend(df, y, n_out=TREND_MAX_POINTS):
+    # LTTB keeps the shape of long series while capping the points sent to the browser
+    if len(df) <= n_out:
+        return df
+    x = df["Ticket Date"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+    idx = MinMaxLTTBDownsampler().downsample(x, df[y].to_numpy(), n_out=n_out)
+    return df.iloc[idx]
+
+# ------------------------
+# EXCEL REPORT (cached per filter state)
+# ------------------------
+@st.cache_data(max_entries=8, show_spinner=False)
+def build_report(_incoming, _outgoing, filter_key):
+    # underscored frames aren't hashed; filter_key (file mtime + every filter
+    # value) identifies them, so reruns with the same filters reuse the bytes
+    output = BytesIO()
+    # no constant_memory: pandas writes cells column by column, which that mode drops
+    with pd.ExcelWriter(output, engine="xlsxwriter", engine_kwargs={"options": {"strings_to_urls": False}}) as writer:
+        _incoming.to_excel(writer, index=False, sheet_name="Incoming")
+        _outgoing.to_excel(writer, index=False, sheet_name="Outgoing")
+    return output.getvalue()
 
 # ------------------------
 # LOGOUT FUNCTION
@@ -42,8 +270,10 @@ def do_logout():
 # PASSWORD CHECK FUNCTION
 # ------------------------
 def check_password(username, password):
+    # only called from the Login button; once logged_in is set, reruns never hash again
     if username in users:
         return bcrypt.checkpw(password.encode(), users[username])
+    bcrypt.checkpw(password.encode(), DUMMY_HASH)
     return False
 
 # ------------------------
@@ -66,6 +296,119 @@ def login_screen():
     if st.session_state.login_error:
         st.error("❌ Invalid username or password")
 
+# ------------------------
+# OVERVIEW TAB
+# ------------------------
+@st.fragment
+def render_overview(filtered_incoming, filtered_outgoing, summary_in, summary_out):
+    # Net Weight by Waste Type
+    # on_change="rerun" makes each expander report .open, so closed charts are never built
+    waste_expander = st.expander("📦 Net Weight by Waste Type", expanded=True, key="overview_waste_type", on_change="rerun")
+    if waste_expander.open:
+        with waste_expander:
+            if not filtered_incoming.empty or not filtered_outgoing.empty:
+                fig1 = make_paired_figure(
+                    "Bar",
+                    "Waste Type ID",
+                    "Net Weight (tn)",
+                    summary_in["by_waste_type"],
+                    summary_out["by_waste_type"],
+                    "Net Weight by Waste Type",
+                    # the two sides' categories differ; let the browser order the bars
+                    layout={"barmode": "group", "xaxis": {"categoryorder": "category ascending"}}
+                )
+                st.plotly_chart(go.Figure(fig1), use_container_width=True)
+            else:
+                st.info("⚠️ No data available for Waste Type breakdown")
+
+    # Pie Charts
+    grade_expander = st.expander("🥧 Material Grade Distribution", expanded=False, key="overview_grade", on_change="rerun")
+    if grade_expander.open:
+        with grade_expander:
+            col_in, col_out = st.columns(2)
+            with col_in:
+                st.subheader("Incoming")
+                if not filtered_incoming.empty:
+                    pie_data_in = summary_in["by_grade"]
+                    fig_pie_in = make_figure("pie", pie_data_in, names="Grade", values="Net Weight (tn)")
+                    st.plotly_chart(go.Figure(fig_pie_in), use_container_width=True)
+                else:
+                    st.info("⚠️ No Incoming Grade data")
+            with col_out:
+                st.subheader("Outgoing")
+                if not filtered_outgoing.empty:
+                    pie_data_out = summary_out["by_grade"]
+                    fig_pie_out = make_figure("pie", pie_data_out, names="Grade", values="Net Weight (tn)")
+                    st.plotly_chart(go.Figure(fig_pie_out), use_container_width=True)
+                else:
+                    st.info("⚠️ No Outgoing Grade data")
+
+    # Trend Charts
+    trend_expander = st.expander("📊 Incoming vs Outgoing Trend", expanded=False, key="overview_trend", on_change="rerun")
+    if trend_expander.open:
+        with trend_expander:
+            if not filtered_incoming.empty or not filtered_outgoing.empty:
+                daily_in = downsample_trend(summary_in["by_day"], "Net Weight (tn)")
+                daily_out = downsample_trend(summary_out["by_day"], "Net Weight (tn)")
+                fig2 = make_paired_figure(
+                    "Scattergl",
+                    "Ticket Date",
+                    "Net Weight (tn)",
+                    daily_in,
+                    daily_out,
+                    "Incoming vs Outgoing Trend",
+                    mode="lines+markers"
+                )
+                st.plotly_chart(go.Figure(fig2), use_container_width=True)
+            else:
+                st.info("⚠️ No trend data")
+
+    cost_expander = st.expander("💰 Cost per Tonne Trend", expanded=False, key="overview_cost", on_change="rerun")
+    if cost_expander.open:
+        with cost_expander:
+            if not filtered_incoming.empty:
+                daily_cpt = summary_in["by_day"].copy()
+                daily_cpt["Cost per Tonne"] = daily_cpt["Cost"] / daily_cpt["Net Weight (tn)"]
+                daily_cpt = downsample_trend(daily_cpt, "Cost per Tonne")
+                fig3 = make_figure(
+                    "line",
+                    daily_cpt,
+                    x="Ticket Date",
+                    y="Cost per Tonne",
+                    markers=True,
+                    line_shape="spline",
+                    title="Weighted Cost per Tonne Trend"
+                )
+                st.plotly_chart(go.Figure(fig3), use_container_width=True)
+            else:
+                st.info("⚠️ No cost data")
+
+# ------------------------
+# DATA TABLES TAB
+# ------------------------
+@st.fragment
+def render_tables(filtered_incoming, filtered_outgoing):
+    tab1, tab2 = st.tabs(["📥 Incoming", "📤 Outgoing"])
+    with tab1:
+        st.dataframe(filtered_incoming, use_container_width=True, hide_index=True)
+    with tab2:
+        st.dataframe(filtered_outgoing, use_container_width=True, hide_index=True)
+
+# ------------------------
+# DOWNLOAD TAB
+# ------------------------
+@st.fragment
+def render_download(filtered_incoming, filtered_outgoing, report_key, start_date, end_date):
+    st.subheader("⬇ Download Filtered Report")
+    # passing a callable defers writing the workbook until the button is clicked
+    st.download_button(
+        label="📥 Download Excel Report",
+        data=partial(build_report, filtered_incoming, filtered_outgoing, report_key),
+        file_name=f"Waste_Report_{start_date.date()}_{end_date.date()}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        on_click="ignore"
+    )
+
 # ------------------------
 # DASHBOARD SCREEN
 # ------------------------
@@ -78,19 +421,8 @@ def dashboard():
     # Load Excel Data
     # ------------------------
     excel_file_path = "Material incoming dashboard.xlsx"
-    incoming_df = pd.read_excel(excel_file_path, sheet_name="INCOMING MASTER")
-    outgoing_df = pd.read_excel(excel_file_path, sheet_name="OUTGOING MASTER")
-    
-    incoming_df.columns = incoming_df.columns.str.strip()
-    outgoing_df.columns = outgoing_df.columns.str.strip()
-    
-    incoming_df["Ticket Date"] = pd.to_datetime(incoming_df["Ticket Date"])
-    outgoing_df["Ticket Date"] = pd.to_datetime(outgoing_df["Ticket Date"])
-    
-    incoming_df["Cost per Tonne"] = incoming_df.apply(
-        lambda row: row["Cost"] / row["Net Weight (tn)"] if row["Net Weight (tn)"] > 0 else 0,
-        axis=1
-    )
+    excel_mtime = os.path.getmtime(excel_file_path)
+    incoming_df, outgoing_df, customer_options, waste_type_options = load_sheets(excel_file_path, excel_mtime)
 
     # ------------------------
     # Filters
@@ -108,21 +440,24 @@ def dashboard():
     </style>
     """, unsafe_allow_html=True)
 
+    # both filter blocks share the option tuples from load_sheets and these
+    # bounds; the index is sorted by day, so its ends are the min and max
+    first_day, last_day = incoming_df.index[0].date(), incoming_df.index[-1].date()
+
     # Desktop filters (sidebar)
     with st.sidebar.container():
         st.markdown('<div class="desktop-sidebar">', unsafe_allow_html=True)
         st.header("🔎 Dashboard Filters")
         date_range = st.date_input(
             "Select Date Range",
-            value=[incoming_df["Ticket Date"].min().date(), incoming_df["Ticket Date"].max().date()],
-            min_value=incoming_df["Ticket Date"].min().date(),
-            max_value=incoming_df["Ticket Date"].max().date()
+            value=[first_day, last_day],
+            min_value=first_day,
+            max_value=last_day
         )
-        customer = st.selectbox("Select Customer", options=["All"] + list(incoming_df["Customer Name"].unique()))
-        waste_type_options = incoming_df["Waste Type ID"].astype(str).str.strip().unique()
-        waste_type = st.multiselect("Select Waste Type", options=["All"] + list(waste_type_options), default=["All"])
+        customer = st.selectbox("Select Customer", options=customer_options)
+        waste_type = st.multiselect("Select Waste Type", options=waste_type_options, default=["All"])
         if "All" in waste_type:
-            waste_type = waste_type_options
+            waste_type = waste_type_options[1:]
         
         # New filter: Priced vs Not Priced
         price_filter = st.radio("Price Filter", options=["All", "Priced", "Not Priced"], index=0)
@@ -133,16 +468,15 @@ def dashboard():
         st.markdown('<div class="mobile-filters">', unsafe_allow_html=True)
         date_range = st.date_input(
             "Select Date Range",
-            value=[incoming_df["Ticket Date"].min().date(), incoming_df["Ticket Date"].max().date()],
-            min_value=incoming_df["Ticket Date"].min().date(),
-            max_value=incoming_df["Ticket Date"].max().date(),
+            value=[first_day, last_day],
+            min_value=first_day,
+            max_value=last_day,
             key="mobile_date"
         )
-        customer = st.selectbox("Select Customer", options=["All"] + list(incoming_df["Customer Name"].unique()), key="mobile_customer")
-        waste_type_options = incoming_df["Waste Type ID"].astype(str).str.strip().unique()
-        waste_type = st.multiselect("Select Waste Type", options=["All"] + list(waste_type_options), default=["All"], key="mobile_waste")
+        customer = st.selectbox("Select Customer", options=customer_options, key="mobile_customer")
+        waste_type = st.multiselect("Select Waste Type", options=waste_type_options, default=["All"], key="mobile_waste")
         if "All" in waste_type:
-            waste_type = waste_type_options
+            waste_type = waste_type_options[1:]
         
         # New filter for mobile
         price_filter = st.radio("Price Filter", options=["All", "Priced", "Not Priced"], index=0, key="mobile_price")
@@ -153,33 +487,17 @@ def dashboard():
     # ------------------------
     start_date, end_date = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
 
-    filtered_incoming = incoming_df[
-        (incoming_df["Ticket Date"].between(start_date, end_date)) &
-        (incoming_df["Waste Type ID"].astype(str).str.strip().isin(waste_type))
-    ]
-    filtered_outgoing = outgoing_df[
-        (outgoing_df["Ticket Date"].between(start_date, end_date)) &
-        (outgoing_df["Waste Type ID"].astype(str).str.strip().isin(waste_type))
-    ]
-
-    if customer != "All":
-        filtered_incoming = filtered_incoming[filtered_incoming["Customer Name"] == customer]
-        filtered_outgoing = filtered_outgoing[filtered_outgoing["Customer Name"] == customer]
-
-    # Apply price filter
-    if price_filter == "Priced":
-        filtered_incoming = filtered_incoming[filtered_incoming["Cost"] > 0]
-    elif price_filter == "Not Priced":
-        filtered_incoming = filtered_incoming[(filtered_incoming["Cost"] == 0) | (filtered_incoming["Cost"].isna())]
+    # sorted, so picking the same waste types in another order still hits the caches
+    filter_key = (excel_mtime, start_date, end_date, tuple(sorted(waste_type)), customer, price_filter)
+    filtered_incoming, filtered_outgoing, summary_in, summary_out = apply_filters(incoming_df, outgoing_df, filter_key)
 
     # ------------------------
     # KPIs
     # ------------------------
-    incoming_total = filtered_incoming["Net Weight (tn)"].sum()
-    outgoing_total = filtered_outgoing["Net Weight (tn)"].sum()
-    total_cost = filtered_incoming["Cost"].sum() if "Cost" in filtered_incoming.columns else 0
+    incoming_total = summary_in["weight"]
+    outgoing_total = summary_out["weight"]
+    total_cost = summary_in["cost"]
     avg_cost_tn = total_cost / incoming_total if incoming_total > 0 else 0
-    plotly_colors = {"Incoming": "#2ca02c", "Outgoing": "#1f77b4"}
 
     st.markdown('<div class="kpi-row">', unsafe_allow_html=True)
     col1, col2, col3, col4 = st.columns(4)
@@ -196,105 +514,13 @@ def dashboard():
     tab_main, tab_data, tab_download = st.tabs(["📊 Overview", "📋 Data Tables", "⬇ Download Report"])
 
     with tab_main:
-        # Net Weight by Waste Type
-        with st.expander("📦 Net Weight by Waste Type", expanded=True):
-            if not filtered_incoming.empty or not filtered_outgoing.empty:
-                waste_in = filtered_incoming.groupby("Waste Type ID")["Net Weight (tn)"].sum().reset_index()
-                waste_in["Type"] = "Incoming"
-                waste_out = filtered_outgoing.groupby("Waste Type ID")["Net Weight (tn)"].sum().reset_index()
-                waste_out["Type"] = "Outgoing"
-                waste_combined = pd.concat([waste_in, waste_out])
-                fig1 = px.bar(
-                    waste_combined,
-                    x="Waste Type ID",
-                    y="Net Weight (tn)",
-                    color="Type",
-                    barmode="group",
-                    color_discrete_map=plotly_colors,
-                    title="Net Weight by Waste Type"
-                )
-                st.plotly_chart(fig1, use_container_width=True)
-            else:
-                st.info("⚠️ No data available for Waste Type breakdown")
-
-        # Pie Charts
-        with st.expander("🥧 Material Grade Distribution", expanded=False):
-            col_in, col_out = st.columns(2)
-            with col_in:
-                st.subheader("Incoming")
-                if not filtered_incoming.empty and "Grade" in filtered_incoming.columns:
-                    pie_data_in = filtered_incoming.groupby("Grade")["Net Weight (tn)"].sum().reset_index()
-                    fig_pie_in = px.pie(pie_data_in, names="Grade", values="Net Weight (tn)")
-                    st.plotly_chart(fig_pie_in, use_container_width=True)
-                else:
-                    st.info("⚠️ No Incoming Grade data")
-            with col_out:
-                st.subheader("Outgoing")
-                if not filtered_outgoing.empty and "Grade" in filtered_outgoing.columns:
-                    pie_data_out = filtered_outgoing.groupby("Grade")["Net Weight (tn)"].sum().reset_index()
-                    fig_pie_out = px.pie(pie_data_out, names="Grade", values="Net Weight (tn)")
-                    st.plotly_chart(fig_pie_out, use_container_width=True)
-                else:
-                    st.info("⚠️ No Outgoing Grade data")
-
-        # Trend Charts
-        with st.expander("📊 Incoming vs Outgoing Trend", expanded=False):
-            if not filtered_incoming.empty or not filtered_outgoing.empty:
-                daily_in = filtered_incoming.groupby("Ticket Date")["Net Weight (tn)"].sum().reset_index()
-                daily_in["Type"] = "Incoming"
-                daily_out = filtered_outgoing.groupby("Ticket Date")["Net Weight (tn)"].sum().reset_index()
-                daily_out["Type"] = "Outgoing"
-                trend_df = pd.concat([daily_in, daily_out])
-                fig2 = px.line(
-                    trend_df,
-                    x="Ticket Date",
-                    y="Net Weight (tn)",
-                    color="Type",
-                    markers=True,
-                    color_discrete_map=plotly_colors,
-                    title="Incoming vs Outgoing Trend"
-                )
-                st.plotly_chart(fig2, use_container_width=True)
-            else:
-                st.info("⚠️ No trend data")
-
-        with st.expander("💰 Cost per Tonne Trend", expanded=False):
-            if not filtered_incoming.empty and "Cost" in filtered_incoming.columns:
-                daily_cost = filtered_incoming.groupby("Ticket Date")["Cost"].sum().reset_index()
-                daily_weight = filtered_incoming.groupby("Ticket Date")["Net Weight (tn)"].sum().reset_index()
-                daily_cpt = pd.merge(daily_cost, daily_weight, on="Ticket Date")
-                daily_cpt["Cost per Tonne"] = daily_cpt["Cost"] / daily_cpt["Net Weight (tn)"]
-                fig3 = px.line(
-                    daily_cpt,
-                    x="Ticket Date",
-                    y="Cost per Tonne",
-                    markers=True,
-                    line_shape="spline",
-                    title="Weighted Cost per Tonne Trend"
-                )
-                st.plotly_chart(fig3, use_container_width=True)
-            else:
-                st.info("⚠️ No cost data")
+        render_overview(filtered_incoming, filtered_outgoing, summary_in, summary_out)
 
     with tab_data:
-        tab1, tab2 = st.tabs(["📥 Incoming", "📤 Outgoing"])
-        with tab1:
-            st.dataframe(filtered_incoming, use_container_width=True)
-        with tab2:
-            st.dataframe(filtered_outgoing, use_container_width=True)
+        render_tables(filtered_incoming, filtered_outgoing)
 
     with tab_download:
-        st.subheader("⬇ Download Filtered Report")
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            filtered_incoming.to_excel(writer, index=False, sheet_name="Incoming")
-            filtered_outgoing.to_excel(writer, index=False, sheet_name="Outgoing")
-        st.download_button(
-            label="📥 Download Excel Report",
-            data=output.getvalue(),
-            file_name=f"Waste_Report_{start_date.date()}_{end_date.date()}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        render_download(filtered_incoming, filtered_outgoing, filter_key, start_date, end_date)
 
     st.divider()
     st.markdown(